@@ -4,6 +4,7 @@ from __future__ import annotations
 import argparse
 import logging
 import os
+import socket
 import sys
 import time
 from pathlib import Path
@@ -15,7 +16,9 @@ if str(PROJECT_ROOT) not in sys.path:
 
 import init
 from monitoring.config import MonitoringConfig, load_config
-from monitoring.persistence import ResultWriter
+from monitoring.limits import LimitRegistry
+from monitoring.persistence import ResultSink, ResultWriter
+from monitoring.sinks import ZABBIX_DEFAULT_KEY, ZABBIX_DEFAULT_PORT, FanOutSink, LineProtocolSink, ZabbixSenderSink
 from threads.factory import build_monitors
 
 DEFAULT_TZ = "Europe/Moscow"
@@ -50,6 +53,37 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Run every monitor once and exit (useful for ad-hoc checks)",
     )
+    parser.add_argument(
+        "--zabbix-server",
+        default=None,
+        help="Push results to a Zabbix server/proxy trapper (HOST or HOST:PORT, default port 10051)",
+    )
+    parser.add_argument(
+        "--zabbix-host",
+        default=socket.gethostname(),
+        help="Host name in Zabbix that owns the trapper items (default: local hostname)",
+    )
+    parser.add_argument(
+        "--zabbix-key",
+        default=ZABBIX_DEFAULT_KEY,
+        help="Trapper item key template, {name} is replaced with the route name (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--line-protocol",
+        default=None,
+        help="Push results in InfluxDB line protocol to tcp://HOST:PORT or udp://HOST:PORT",
+    )
+    parser.add_argument(
+        "--spool-dir",
+        default="monitoring_spool",
+        help="Directory for results that could not be pushed while the receiver was unreachable",
+    )
+    parser.add_argument(
+        "--push-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between batched pushes to remote receivers (default: 5)",
+    )
     return parser.parse_args()
 
 
@@ -65,6 +99,37 @@ def configure_timezone(default_tz: str = DEFAULT_TZ) -> str:
     return tz_value
 
 
+def build_sink(args: argparse.Namespace) -> ResultSink:
+    """Собирает получателей результатов: JSON-файл и, при необходимости, удалённые коллекторы."""
+    sinks = [ResultWriter(args.results_path)]
+    spool_dir = Path(args.spool_dir).expanduser()
+
+    if args.zabbix_server:
+        server, _, port = args.zabbix_server.partition(":")
+        sinks.append(
+            ZabbixSenderSink(
+                server=server,
+                port=int(port) if port else ZABBIX_DEFAULT_PORT,
+                host=args.zabbix_host,
+                key_template=args.zabbix_key,
+                flush_interval=args.push_interval,
+                spool_path=str(spool_dir / "zabbix.jsonl"),
+            )
+        )
+    if args.line_protocol:
+        sinks.append(
+            LineProtocolSink(
+                url=args.line_protocol,
+                flush_interval=args.push_interval,
+                spool_path=str(spool_dir / "line_protocol.jsonl"),
+            )
+        )
+
+    if len(sinks) == 1:
+        return sinks[0]
+    return FanOutSink(sinks)
+
+
 def _wait_for(monitors, stop_event: Event, one_shot: bool) -> None:
     try:
         while True:
@@ -99,13 +164,24 @@ def main() -> int:
         logging.warning("No enabled routes configured. Nothing to monitor.")
         return 0
 
-    writer = ResultWriter(args.results_path)
+    try:
+        writer = build_sink(args)
+    except Exception as exc:  # noqa: BLE001
+        logging.error("Failed to initialize result sinks: %s", exc)
+        return 1
     stop_event = Event()
 
     try:
-        monitors = build_monitors(enabled_routes, writer, stop_event, one_shot=args.one_shot)
+        monitors = build_monitors(
+            enabled_routes,
+            writer,
+            stop_event,
+            one_shot=args.one_shot,
+            limits=LimitRegistry(config.limits),
+        )
     except Exception as exc:  # noqa: BLE001
         logging.error("Failed to initialize monitors: %s", exc)
+        writer.close()
         return 1
 
     for monitor in monitors:
@@ -119,6 +195,7 @@ def main() -> int:
         )
 
     _wait_for(monitors, stop_event, args.one_shot)
+    writer.close()
     logging.info("Monitoring stopped")
     return 0
 
@@ -2,9 +2,9 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Iterable, List
+from typing import Any, Dict, Iterable, List, Tuple
 
 try:
     import yaml
@@ -14,7 +14,7 @@ except ModuleNotFoundError as exc:  # pragma: no cover - защитный бло
         "`pip install PyYAML` и повторите запуск."
     ) from exc
 
-from .types import HttpRouteConfig
+from .types import HttpRouteConfig, RateLimitConfig
 
 SUPPORTED_EXTENSIONS = {".yaml", ".yml", ".json"}
 
@@ -22,6 +22,7 @@ SUPPORTED_EXTENSIONS = {".yaml", ".yml", ".json"}
 @dataclass
 class MonitoringConfig:
     routes: List[HttpRouteConfig]
+    limits: List[RateLimitConfig] = field(default_factory=list)
 
     @property
     def enabled_routes(self) -> List[HttpRouteConfig]:
@@ -44,21 +45,26 @@ def load_config(config_path: str) -> MonitoringConfig:
         raise FileNotFoundError(f"Config file or directory not found: {path}")
 
     routes: List[HttpRouteConfig] = []
+    limits: Dict[str, RateLimitConfig] = {}
 
     if path.is_file():
-        routes.extend(_load_routes_from_file(path, source_label=path.name))
+        file_routes, file_limits = _load_file(path, source_label=path.name)
+        routes.extend(file_routes)
+        _merge_limits(limits, file_limits, path)
     else:
         config_files = sorted(_iter_config_files(path))
         if not config_files:
             raise ValueError(f"Directory {path} does not contain config files (*.yaml, *.yml, *.json)")
         for file_path in config_files:
             relative = file_path.relative_to(path).as_posix()
-            routes.extend(_load_routes_from_file(file_path, source_label=relative))
+            file_routes, file_limits = _load_file(file_path, source_label=relative)
+            routes.extend(file_routes)
+            _merge_limits(limits, file_limits, file_path)
 
     if not routes:
         raise ValueError("Config does not contain any routes")
 
-    return MonitoringConfig(routes=routes)
+    return MonitoringConfig(routes=routes, limits=list(limits.values()))
 
 
 def _iter_config_files(root: Path) -> Iterable[Path]:
@@ -67,11 +73,21 @@ def _iter_config_files(root: Path) -> Iterable[Path]:
             yield candidate
 
 
-def _load_routes_from_file(path: Path, source_label: str) -> List[HttpRouteConfig]:
+def _merge_limits(target: Dict[str, RateLimitConfig], limits: List[RateLimitConfig], path: Path) -> None:
+    for limit in limits:
+        if limit.key in target:
+            raise ValueError(f"Duplicate limit {limit.key} in {path}")
+        target[limit.key] = limit
+
+
+def _load_file(path: Path, source_label: str) -> Tuple[List[HttpRouteConfig], List[RateLimitConfig]]:
     raw_config = _read_file(path)
-    if "routes" not in raw_config:
-        raise ValueError(f"Config file {path} must contain a 'routes' section")
+    if "routes" not in raw_config and "limits" not in raw_config:
+        raise ValueError(f"Config file {path} must contain a 'routes' or 'limits' section")
     base_dir = path.parent
-    return [
-        HttpRouteConfig.from_dict(entry, source_path=source_label, base_dir=base_dir) for entry in raw_config["routes"]
+    routes = [
+        HttpRouteConfig.from_dict(entry, source_path=source_label, base_dir=base_dir)
+        for entry in raw_config.get("routes") or []
     ]
+    limits = [RateLimitConfig.from_dict(entry) for entry in raw_config.get("limits") or []]
+    return routes, limits
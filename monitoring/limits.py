@@ -0,0 +1,142 @@
+"""Ограничение частоты и параллельности запросов к общим бэкендам."""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from .types import HttpRouteConfig, RateLimitConfig
+
+DEFAULT_HOST_KEY = "*"
+_SLOT_POLL_SECONDS = 0.5
+
+
+class LimitWaitCancelled(RuntimeError):
+    """Ожидание лимита прервано остановкой мониторинга."""
+
+
+class TokenBucket:
+    """Классический token bucket: `rate` токенов в секунду, не больше `capacity` в запасе."""
+
+    def __init__(self, rate: float, capacity: Optional[int] = None) -> None:
+        self.rate = rate
+        self.capacity = float(capacity or max(int(rate), 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self) -> float:
+        """Забирает токен и возвращает 0, либо возвращает время ожидания до следующего токена."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def refund(self) -> None:
+        """Возвращает токен, который не был потрачен на запрос."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1.0)
+
+
+class HostLimiter:
+    """Лимит одного хоста или тега: token bucket и/или семафор запросов в полёте."""
+
+    def __init__(self, config: RateLimitConfig, key: Optional[str] = None) -> None:
+        self.key = key or config.key
+        self.bucket = TokenBucket(config.rate, config.burst) if config.rate else None
+        self.slots = threading.BoundedSemaphore(config.max_in_flight) if config.max_in_flight else None
+
+    def acquire_slot(self, stop_event: threading.Event) -> None:
+        if self.slots is None:
+            return
+        while not self.slots.acquire(timeout=_SLOT_POLL_SECONDS):
+            if stop_event.is_set():
+                raise LimitWaitCancelled(self.key)
+
+    def release_slot(self) -> None:
+        if self.slots is not None:
+            self.slots.release()
+
+
+class RouteLimiter:
+    """Набор лимитов, которые применяются к конкретному маршруту."""
+
+    def __init__(self, limiters: Sequence[HostLimiter] = ()) -> None:
+        # Единый порядок захвата слотов исключает взаимные блокировки между маршрутами.
+        self.limiters = sorted(limiters, key=lambda limiter: limiter.key)
+
+    @contextmanager
+    def acquire(self, stop_event: threading.Event) -> Iterator[float]:
+        """Ждёт свободный слот и токен во всех лимитах, возвращает время ожидания в миллисекундах."""
+        start = time.perf_counter()
+        acquired: List[HostLimiter] = []
+        try:
+            for limiter in self.limiters:
+                limiter.acquire_slot(stop_event)
+                acquired.append(limiter)
+            # Токены берутся уже со слотами, чтобы момент списания совпадал с отправкой запроса.
+            self._take_tokens(stop_event)
+            yield round((time.perf_counter() - start) * 1000, 2)
+        finally:
+            for limiter in reversed(acquired):
+                limiter.release_slot()
+
+    def _take_tokens(self, stop_event: threading.Event) -> None:
+        """Списывает по токену из всех bucket сразу либо не списывает ни одного."""
+        buckets = [limiter.bucket for limiter in self.limiters if limiter.bucket is not None]
+        while True:
+            taken: List[TokenBucket] = []
+            delay = 0.0
+            for bucket in buckets:
+                delay = bucket.try_take()
+                if delay:
+                    break
+                taken.append(bucket)
+            if not delay:
+                return
+            for bucket in taken:
+                bucket.refund()
+            if stop_event.wait(delay):
+                raise LimitWaitCancelled(self.limiters[0].key)
+
+
+class LimitRegistry:
+    """Разделяемые между потоками лимиты, сгруппированные по хостам и тегам."""
+
+    def __init__(self, limits: Sequence[RateLimitConfig] = ()) -> None:
+        self._configs: Dict[str, RateLimitConfig] = {limit.key: limit for limit in limits}
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_route(self, route: HttpRouteConfig) -> RouteLimiter:
+        limiters: List[HostLimiter] = []
+        host = (urlsplit(route.url).hostname or "").lower()
+        host_limiter = self._get(f"host:{host}") or self._get(f"host:{DEFAULT_HOST_KEY}", key=f"host:{host}")
+        if host_limiter:
+            limiters.append(host_limiter)
+        for tag in dict.fromkeys(route.tags):
+            tag_limiter = self._get(f"tag:{tag}")
+            if tag_limiter:
+                limiters.append(tag_limiter)
+        return RouteLimiter(limiters)
+
+    def _get(self, config_key: str, key: Optional[str] = None) -> Optional[HostLimiter]:
+        config = self._configs.get(config_key)
+        if config is None:
+            return None
+        limiter_key = key or config_key
+        with self._lock:
+            limiter = self._limiters.get(limiter_key)
+            if limiter is None:
+                limiter = HostLimiter(config, key=limiter_key)
+                self._limiters[limiter_key] = limiter
+            return limiter
+
+
+__all__ = ["LimitRegistry", "LimitWaitCancelled", "RouteLimiter", "TokenBucket"]
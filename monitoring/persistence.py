@@ -10,7 +10,17 @@ from typing import Any, Dict
 from .types import HttpRouteConfig
 
 
-class ResultWriter:
+class ResultSink:
+    """Получатель результатов проверок: файл, удалённый коллектор и т.п."""
+
+    def write_result(self, route_config: HttpRouteConfig, payload: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Освобождает ресурсы и дописывает накопленные результаты."""
+
+
+class ResultWriter(ResultSink):
     """Хранит последние результаты проверок для чтения агентом Zabbix."""
 
     def __init__(self, output_path: str, schema_version: int = 1) -> None:
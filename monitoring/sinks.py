@@ -0,0 +1,402 @@
+"""Асинхронная отправка результатов мониторинга во внешние коллекторы."""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import socket
+import struct
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .persistence import ResultSink
+from .types import HttpRouteConfig
+
+ZABBIX_HEADER = b"ZBXD\x01"
+ZABBIX_DEFAULT_PORT = 10051
+ZABBIX_DEFAULT_KEY = "sber.monitoring.result[{name}]"
+ZABBIX_FAILED_RE = re.compile(r"failed:\s*(\d+)")
+UDP_MAX_DATAGRAM = 1400
+
+
+class SinkError(RuntimeError):
+    """Коллектор недоступен или оборвал обмен, пачку стоит повторить позже."""
+
+
+class SinkRejected(SinkError):
+    """Коллектор ответил, но отклонил пачку: повтор не поможет."""
+
+
+class FanOutSink(ResultSink):
+    """Передаёт каждый результат во все вложенные получатели."""
+
+    def __init__(self, sinks: Sequence[ResultSink]) -> None:
+        self.sinks = list(sinks)
+        self.logger = logging.getLogger("sinks")
+
+    def write_result(self, route_config: HttpRouteConfig, payload: Dict[str, Any]) -> None:
+        for sink in self.sinks:
+            try:
+                sink.write_result(route_config, payload)
+            except Exception:  # noqa: BLE001
+                self.logger.exception("Не удалось передать результат %s в %s", route_config.name, type(sink).__name__)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class BatchingSink(ResultSink):
+    """Копит результаты в ограниченной очереди и отправляет их пачками из фонового потока.
+
+    Потоки мониторинга только кладут запись в очередь и никогда не ждут сеть. Пока запись
+    не отправлена, новый результат того же маршрута заменяет старый. Если коллектор
+    недоступен, пачка дописывается в файл `spool_path` (JSON Lines) и отправляется первой,
+    когда связь восстановится.
+    """
+
+    name = "sink"
+
+    def __init__(
+        self,
+        max_queue: int = 1000,
+        batch_size: int = 250,
+        flush_interval: float = 5.0,
+        spool_path: Optional[str] = None,
+        spool_max_bytes: int = 10 * 1024 * 1024,
+    ) -> None:
+        self.max_queue = max(max_queue, 1)
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = max(flush_interval, 0.1)
+        self.spool_path = Path(spool_path).expanduser() if spool_path else None
+        self.spool_max_bytes = spool_max_bytes
+        self.logger = logging.getLogger(f"sinks.{self.name}")
+        self.dropped = 0
+        self._pending: "OrderedDict[str, Any]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        # Абсолютное смещение начала файла спула: растёт, когда голова файла отрезается.
+        self._spool_base = 0
+        self._in_flight: List[Any] = []
+        self._stopping = False
+        self._available = True
+        self._thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+        self._thread.start()
+
+    def write_result(self, route_config: HttpRouteConfig, payload: Dict[str, Any]) -> None:
+        record = self._format(route_config, payload)
+        with self._cond:
+            if route_config.name in self._pending:
+                self._pending[route_config.name] = record
+                return
+            if len(self._pending) >= self.max_queue:
+                dropped_name, _ = self._pending.popitem(last=False)
+                self.dropped += 1
+                self.logger.warning("Очередь отправки переполнена, отброшен результат %s", dropped_name)
+            self._pending[route_config.name] = record
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self) -> bool:
+        """Синхронно отправляет спул и очередь. Возвращает False, если коллектор недоступен."""
+        with self._flush_lock:
+            if not self._flush_spool():
+                self._spool(self._take_all())
+                return False
+            delivered = True
+            for batch in self._chunks(self._take_all()):
+                self._in_flight = batch
+                if delivered and self._try_send(batch):
+                    self._in_flight = []
+                    continue
+                delivered = False
+                self._spool(batch)
+                self._in_flight = []
+            return delivered
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            # Поток завис на отправке и будет убит при выходе: сохраняем всё, что не ушло.
+            # Если отправка всё же завершится, пачка в полёте может прийти повторно.
+            self.logger.warning(
+                "Отправка не завершилась за %s с, неотправленные результаты сохраняются в спул", timeout
+            )
+            self._spool(list(self._in_flight) + self._take_all())
+
+    def _format(self, route_config: HttpRouteConfig, payload: Dict[str, Any]) -> Any:
+        """Преобразует результат в JSON-сериализуемую запись протокола."""
+        raise NotImplementedError
+
+    def _send_batch(self, records: List[Any]) -> None:
+        """Отправляет пачку записей, при ошибке бросает OSError или SinkError."""
+        raise NotImplementedError
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001
+                self.logger.exception("Необработанная ошибка при отправке результатов")
+            if stopping:
+                return
+
+    def _take_all(self) -> List[Any]:
+        with self._cond:
+            records = list(self._pending.values())
+            self._pending.clear()
+        return records
+
+    def _chunks(self, records: List[Any]) -> List[List[Any]]:
+        return [records[i : i + self.batch_size] for i in range(0, len(records), self.batch_size)]
+
+    def _try_send(self, records: List[Any]) -> bool:
+        """Возвращает False, только если пачку нужно повторить позже."""
+        try:
+            self._send_batch(records)
+        except SinkRejected as exc:
+            self.dropped += len(records)
+            self.logger.error("Коллектор отклонил пачку, записи отброшены: %s; пачка: %s", exc, records)
+            return True
+        except (OSError, SinkError) as exc:
+            if self._available:
+                self.logger.warning("Коллектор недоступен, результаты сохраняются в спул: %s", exc)
+            self._available = False
+            return False
+        if not self._available:
+            self.logger.info("Связь с коллектором восстановлена")
+        self._available = True
+        return True
+
+    def _flush_spool(self) -> bool:
+        if not self.spool_path or not self.spool_path.exists():
+            return True
+        entries = self._read_spool()
+        delivered = True
+        sent_to: Optional[int] = None
+        for batch in self._chunks(entries):
+            if not self._try_send([record for _, record in batch]):
+                delivered = False
+                break
+            sent_to = batch[-1][0]
+        if sent_to is not None:
+            self._drop_spooled(sent_to)
+        return delivered
+
+    def _drop_spooled(self, sent_to: int) -> None:
+        """Отрезает из спула всё до абсолютного смещения `sent_to`, сохраняя дописанные записи."""
+        with self._spool_lock:
+            cut = sent_to - self._spool_base
+            if cut <= 0 or not self.spool_path.exists():
+                return
+            rest = self.spool_path.read_bytes()[cut:]
+            self._spool_base += cut
+            if rest:
+                self._replace_spool(rest)
+            else:
+                self.spool_path.unlink()
+
+    def _spool(self, records: List[Any]) -> None:
+        if not records:
+            return
+        if not self.spool_path:
+            self.dropped += len(records)
+            self.logger.warning("Спул не настроен, отброшено результатов: %s", len(records))
+            return
+        data = "".join(f"{json.dumps(record, ensure_ascii=False)}\n" for record in records).encode("utf-8")
+        with self._spool_lock:
+            self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.spool_path.open("ab") as spool:
+                spool.write(data)
+            if self.spool_path.stat().st_size > self.spool_max_bytes:
+                self._trim_spool()
+
+    def _trim_spool(self) -> None:
+        """Удаляет самые старые записи, пока спул не уложится в `spool_max_bytes`."""
+        data = self.spool_path.read_bytes()
+        cut = 0
+        for line in data.splitlines(keepends=True):
+            if len(data) - cut <= self.spool_max_bytes:
+                break
+            cut += len(line)
+            self.dropped += 1
+        self._spool_base += cut
+        self._replace_spool(data[cut:])
+
+    def _replace_spool(self, data: bytes) -> None:
+        tmp_path = self.spool_path.with_suffix(self.spool_path.suffix + ".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(self.spool_path)
+
+    def _read_spool(self) -> List[Tuple[int, Any]]:
+        """Читает спул как пары (абсолютное смещение конца записи, запись)."""
+        with self._spool_lock:
+            if not self.spool_path or not self.spool_path.exists():
+                return []
+            data = self.spool_path.read_bytes()
+            offset = self._spool_base
+        entries = []
+        for line in data.splitlines(keepends=True):
+            offset += len(line)
+            try:
+                entries.append((offset, json.loads(line)))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+        return entries
+
+    @staticmethod
+    def _clock(payload: Dict[str, Any]) -> float:
+        try:
+            return datetime.fromisoformat(str(payload.get("timestamp"))).timestamp()
+        except ValueError:
+            return datetime.now().timestamp()
+
+
+class ZabbixSenderSink(BatchingSink):
+    """Отправляет результаты в Zabbix trapper по протоколу zabbix_sender.
+
+    Каждый маршрут — отдельный элемент данных `key_template` (по умолчанию
+    `sber.monitoring.result[<name>]`) со значением в виде JSON результата.
+    """
+
+    name = "zabbix"
+
+    def __init__(
+        self,
+        server: str,
+        host: str,
+        port: int = ZABBIX_DEFAULT_PORT,
+        key_template: str = ZABBIX_DEFAULT_KEY,
+        timeout: float = 10.0,
+        **kwargs: Any,
+    ) -> None:
+        self.server = server
+        self.port = port
+        self.host = host
+        self.key_template = key_template
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def _format(self, route_config: HttpRouteConfig, payload: Dict[str, Any]) -> Any:
+        clock = self._clock(payload)
+        return {
+            "host": self.host,
+            "key": self.key_template.format(name=route_config.name),
+            "value": json.dumps(payload, ensure_ascii=False),
+            "clock": int(clock),
+            "ns": int((clock % 1) * 1_000_000_000),
+        }
+
+    def _send_batch(self, records: List[Any]) -> None:
+        body = json.dumps({"request": "sender data", "data": records}, ensure_ascii=False).encode("utf-8")
+        with socket.create_connection((self.server, self.port), timeout=self.timeout) as conn:
+            conn.sendall(ZABBIX_HEADER + struct.pack("<II", len(body), 0) + body)
+            header = self._recv_exact(conn, len(ZABBIX_HEADER) + 8)
+            if not header.startswith(ZABBIX_HEADER):
+                raise SinkError(f"Unexpected Zabbix response header: {header!r}")
+            length, _ = struct.unpack("<II", header[len(ZABBIX_HEADER) :])
+            response = json.loads(self._recv_exact(conn, length).decode("utf-8"))
+        if response.get("response") != "success":
+            raise SinkRejected(f"Zabbix rejected batch: {response}")
+        info = str(response.get("info", ""))
+        failed = ZABBIX_FAILED_RE.search(info)
+        if failed and int(failed.group(1)) > 0:
+            self.logger.warning(
+                "Zabbix отклонил часть значений (проверьте --zabbix-host и trapper-элементы): %s", info
+            )
+        else:
+            self.logger.debug("Zabbix: %s", info)
+
+    @staticmethod
+    def _recv_exact(conn: socket.socket, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            chunk = conn.recv(size)
+            if not chunk:
+                raise SinkError("Connection closed by Zabbix server")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+
+class LineProtocolSink(BatchingSink):
+    """Отправляет результаты в формате InfluxDB line protocol по TCP или UDP."""
+
+    name = "line_protocol"
+
+    def __init__(self, url: str, measurement: str = "http_route", timeout: float = 10.0, **kwargs: Any) -> None:
+        self.scheme, self.address = self.parse_url(url)
+        self.measurement = measurement
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def parse_url(url: str) -> Tuple[str, Tuple[str, int]]:
+        parts = urlsplit(url)
+        if parts.scheme not in {"tcp", "udp"} or not parts.hostname or not parts.port:
+            raise ValueError(f"Line protocol address must look like tcp://host:port or udp://host:port: {url}")
+        return parts.scheme, (parts.hostname, parts.port)
+
+    def _format(self, route_config: HttpRouteConfig, payload: Dict[str, Any]) -> Any:
+        tags = {"name": route_config.name, "method": payload.get("method")}
+        fields = {
+            "ok": payload.get("ok"),
+            "status_code": payload.get("status_code"),
+            "response_time_ms": payload.get("response_time_ms"),
+            "limit_wait_ms": payload.get("limit_wait_ms"),
+            "error": payload.get("error"),
+        }
+        tag_part = ",".join(f"{key}={self._escape_tag(value)}" for key, value in tags.items() if value)
+        field_part = ",".join(
+            f"{key}={self._field_value(value)}" for key, value in fields.items() if value is not None
+        )
+        timestamp = int(self._clock(payload) * 1_000_000_000)
+        return f"{self._escape_tag(self.measurement)},{tag_part} {field_part} {timestamp}"
+
+    def _send_batch(self, records: List[Any]) -> None:
+        if self.scheme == "tcp":
+            with socket.create_connection(self.address, timeout=self.timeout) as conn:
+                conn.sendall("".join(f"{line}\n" for line in records).encode("utf-8"))
+            return
+        family, _, _, _, address = socket.getaddrinfo(*self.address, type=socket.SOCK_DGRAM)[0]
+        with socket.socket(family, socket.SOCK_DGRAM) as conn:
+            datagram = b""
+            for line in records:
+                encoded = f"{line}\n".encode("utf-8")
+                if datagram and len(datagram) + len(encoded) > UDP_MAX_DATAGRAM:
+                    conn.sendto(datagram, address)
+                    datagram = b""
+                datagram += encoded
+            if datagram:
+                conn.sendto(datagram, address)
+
+    @staticmethod
+    def _escape_tag(value: Any) -> str:
+        return str(value).replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+    @staticmethod
+    def _field_value(value: Any) -> str:
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, int):
+            return f"{value}i"
+        if isinstance(value, float) and math.isfinite(value):
+            return repr(value)
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+
+
+__all__ = ["BatchingSink", "FanOutSink", "LineProtocolSink", "SinkError", "SinkRejected", "ZabbixSenderSink"]
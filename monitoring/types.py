@@ -27,6 +27,58 @@ class BasicAuthConfig:
     password: str
 
 
+@dataclass
+class RateLimitConfig:
+    """Ограничение частоты и параллельности запросов к хосту или группе маршрутов по тегу.
+
+    `host: "*"` задаёт лимит по умолчанию, который применяется отдельно к каждому хосту без
+    собственного правила.
+    """
+
+    host: Optional[str] = None
+    tag: Optional[str] = None
+    rate: Optional[float] = None
+    burst: Optional[int] = None
+    max_in_flight: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any]) -> "RateLimitConfig":
+        host = raw.get("host")
+        tag = raw.get("tag")
+        if bool(host) == bool(tag):
+            raise ValueError(f"Limit must define exactly one of 'host' or 'tag': {dict(raw)}")
+
+        rate = raw.get("rate", raw.get("rps"))
+        rate = float(rate) if rate is not None else None
+        if rate is not None and rate <= 0:
+            raise ValueError(f"Limit rate must be positive: {dict(raw)}")
+
+        burst = raw.get("burst")
+        burst = int(burst) if burst is not None else None
+        if burst is not None and burst < 1:
+            raise ValueError(f"Limit burst must be at least 1: {dict(raw)}")
+
+        max_in_flight = raw.get("max_in_flight", raw.get("concurrency"))
+        max_in_flight = int(max_in_flight) if max_in_flight is not None else None
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError(f"Limit max_in_flight must be at least 1: {dict(raw)}")
+
+        if rate is None and max_in_flight is None:
+            raise ValueError(f"Limit must define 'rate' and/or 'max_in_flight': {dict(raw)}")
+
+        return cls(
+            host=str(host).lower() if host else None,
+            tag=str(tag) if tag else None,
+            rate=rate,
+            burst=burst,
+            max_in_flight=max_in_flight,
+        )
+
+    @property
+    def key(self) -> str:
+        return f"host:{self.host}" if self.host else f"tag:{self.tag}"
+
+
 @dataclass
 class HttpRouteConfig:
     """Конфигурация одного HTTP-монитора."""
@@ -0,0 +1,178 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from monitoring.config import load_config
+from monitoring.limits import LimitRegistry, LimitWaitCancelled
+from monitoring.types import HttpRouteConfig, RateLimitConfig
+from threads.http_route import HttpRouteMonitor
+
+
+def _route(name, tags=(), url="http://backend.local/"):
+    return HttpRouteConfig(name=name, url=url, tags=list(tags))
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.results = []
+
+    def write_result(self, route_config, payload):
+        self.results.append(payload)
+
+
+def _ok_response():
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response._content = b"ok"
+    response.encoding = "utf-8"
+    return response
+
+
+def test_tokens_are_spent_when_slot_is_free():
+    limits = LimitRegistry(
+        [RateLimitConfig.from_dict({"host": "backend.local", "rate": 10, "burst": 1, "max_in_flight": 1})]
+    )
+    stop_event = threading.Event()
+    started = time.monotonic()
+    sends = []
+
+    def probe(name, hold):
+        with limits.for_route(_route(name)).acquire(stop_event):
+            sends.append(time.monotonic() - started)
+            time.sleep(hold)
+
+    slow = threading.Thread(target=probe, args=("slow", 0.5))
+    slow.start()
+    time.sleep(0.05)
+    waiting = [threading.Thread(target=probe, args=(f"r{i}", 0)) for i in range(4)]
+    for thread in waiting:
+        thread.start()
+    for thread in [slow, *waiting]:
+        thread.join()
+
+    sends.sort()
+    gaps = [later - earlier for earlier, later in zip(sends[1:], sends[2:])]
+    assert all(gap >= 0.08 for gap in gaps)
+
+
+def test_tokens_are_refunded_when_another_bucket_is_empty():
+    limits = LimitRegistry(
+        [
+            RateLimitConfig.from_dict({"host": "backend.local", "rate": 1, "burst": 1}),
+            RateLimitConfig.from_dict({"tag": "slow", "rate": 5, "burst": 1}),
+        ]
+    )
+    route_limiter = limits.for_route(_route("tagged", ["slow"]))
+    tag_bucket = route_limiter.limiters[1].bucket
+    assert tag_bucket.try_take() == 0
+
+    # Без возврата токена хоста ожидание растянулось бы до секунды (rate хоста = 1).
+    with route_limiter.acquire(threading.Event()) as wait_ms:
+        pass
+    assert wait_ms < 500
+
+
+def test_burst_below_one_is_rejected():
+    with pytest.raises(ValueError):
+        RateLimitConfig.from_dict({"host": "backend.local", "rate": 1, "burst": 0})
+
+
+def test_limits_only_file_is_loaded(tmp_path):
+    (tmp_path / "routes.yaml").write_text("routes:\n  - name: a\n    url: http://backend.local/\n")
+    (tmp_path / "limits.yaml").write_text("limits:\n  - host: Backend.Local\n    max_in_flight: 2\n")
+
+    config = load_config(str(tmp_path))
+
+    assert [route.name for route in config.routes] == ["a"]
+    assert config.limits == [RateLimitConfig(host="backend.local", max_in_flight=2)]
+
+
+@pytest.mark.parametrize("rule", ["host: backend.local", "tag: slow"])
+def test_duplicate_limit_across_files_is_rejected(tmp_path, rule):
+    (tmp_path / "a.yaml").write_text(
+        f"routes:\n  - name: a\n    url: http://backend.local/\nlimits:\n  - {rule}\n    rate: 1\n"
+    )
+    (tmp_path / "b.yaml").write_text(f"limits:\n  - {rule}\n    rate: 2\n")
+
+    with pytest.raises(ValueError, match="Duplicate limit"):
+        load_config(str(tmp_path))
+
+
+def test_default_host_limit_is_separate_per_host():
+    limits = LimitRegistry([RateLimitConfig.from_dict({"host": "*", "max_in_flight": 1})])
+
+    first = limits.for_route(_route("a", url="http://one.local/a")).limiters
+    same_host = limits.for_route(_route("b", url="http://ONE.local/b")).limiters
+    other_host = limits.for_route(_route("c", url="http://two.local/")).limiters
+
+    assert [limiter.key for limiter in first] == ["host:one.local"]
+    assert first[0] is same_host[0]
+    assert other_host[0] is not first[0]
+    assert other_host[0].key == "host:two.local"
+
+
+def test_host_and_tag_limits_both_apply():
+    limits = LimitRegistry(
+        [
+            RateLimitConfig.from_dict({"host": "backend.local", "max_in_flight": 1}),
+            RateLimitConfig.from_dict({"tag": "slow", "max_in_flight": 1}),
+        ]
+    )
+
+    tagged = limits.for_route(_route("a", ["slow", "other"]))
+    untagged = limits.for_route(_route("b"))
+
+    assert [limiter.key for limiter in tagged.limiters] == ["host:backend.local", "tag:slow"]
+    assert [limiter.key for limiter in untagged.limiters] == ["host:backend.local"]
+    assert tagged.limiters[0] is untagged.limiters[0]
+
+
+def test_monitor_reports_limit_wait_separately(monkeypatch):
+    limits = LimitRegistry([RateLimitConfig.from_dict({"host": "backend.local", "rate": 5, "burst": 1})])
+    route = _route("a")
+    route_limiter = limits.for_route(route)
+    route_limiter.limiters[0].bucket.try_take()
+    writer = RecordingWriter()
+    monitor = HttpRouteMonitor(route, writer, threading.Event(), one_shot=True, limiter=route_limiter)
+    monkeypatch.setattr(monitor.session, "request", lambda **kwargs: _ok_response())
+
+    monitor.run_once()
+
+    [result] = writer.results
+    assert result["ok"] is True
+    assert result["limit_wait_ms"] >= 150
+    assert result["response_time_ms"] < 100
+
+
+def test_stop_while_waiting_cancels_probe(monkeypatch):
+    limits = LimitRegistry([RateLimitConfig.from_dict({"host": "backend.local", "max_in_flight": 1})])
+    route = _route("a")
+    stop_event = threading.Event()
+    writer = RecordingWriter()
+    monitor = HttpRouteMonitor(route, writer, stop_event, limiter=limits.for_route(route))
+    monkeypatch.setattr(monitor.session, "request", lambda **kwargs: _ok_response())
+    timer = threading.Timer(0.1, stop_event.set)
+
+    with limits.for_route(route).acquire(threading.Event()):
+        timer.start()
+        monitor.run_once()
+    timer.join()
+
+    assert writer.results == []
+
+
+def test_cancelled_wait_raises_and_releases_slots():
+    limits = LimitRegistry([RateLimitConfig.from_dict({"host": "backend.local", "max_in_flight": 1})])
+    holder = limits.for_route(_route("holder"))
+    stop_event = threading.Event()
+    stop_event.set()
+
+    with holder.acquire(threading.Event()):
+        with pytest.raises(LimitWaitCancelled):
+            with limits.for_route(_route("waiter")).acquire(stop_event):
+                pass
+    with holder.acquire(threading.Event()) as wait_ms:
+        assert wait_ms < 100
@@ -0,0 +1,445 @@
+import argparse
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import main
+from monitoring.persistence import ResultSink, ResultWriter
+from monitoring.sinks import (
+    UDP_MAX_DATAGRAM,
+    ZABBIX_HEADER,
+    FanOutSink,
+    LineProtocolSink,
+    ZabbixSenderSink,
+)
+from monitoring.types import HttpRouteConfig
+
+
+class FakeTrapper:
+    """Минимальный Zabbix trapper: принимает пачки sender data и запоминает их."""
+
+    def __init__(self, port: int = 0, reply: bool = True, failed: int = 0, response: str = "success") -> None:
+        self.reply = reply
+        self.failed = failed
+        self.response = response
+        self.headers = []
+        self.batches = []
+        self._server = socket.socket()
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", port))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        self._connections = []
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            self._connections.append(conn)
+            header = self._recv(conn, len(ZABBIX_HEADER) + 8)
+            if len(header) < len(ZABBIX_HEADER) + 8:
+                conn.close()
+                continue
+            length, _ = struct.unpack("<II", header[len(ZABBIX_HEADER) :])
+            request = json.loads(self._recv(conn, length))
+            self.headers.append(header)
+            self.batches.append(request)
+            if not self.reply:
+                continue
+            processed = len(request["data"]) - self.failed
+            body = json.dumps(
+                {"response": self.response, "info": f"processed: {processed}; failed: {self.failed}"}
+            ).encode("utf-8")
+            conn.sendall(ZABBIX_HEADER + struct.pack("<II", len(body), 0) + body)
+            conn.close()
+
+    @staticmethod
+    def _recv(conn: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def keys(self):
+        return [
+            [(item["key"], json.loads(item["value"])["attempt"]) for item in batch["data"]] for batch in self.batches
+        ]
+
+    def close(self) -> None:
+        self._server.close()
+        for conn in self._connections:
+            conn.close()
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("condition was not met in time")
+        time.sleep(0.05)
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _route(name: str) -> HttpRouteConfig:
+    return HttpRouteConfig(name=name, url=f"http://backend.local/{name}")
+
+
+def _payload(name: str, attempt: int) -> dict:
+    return {"name": name, "timestamp": "2024-05-28T12:00:00.250000+00:00", "ok": True, "attempt": attempt}
+
+
+@pytest.fixture
+def make_sink(tmp_path):
+    sinks = []
+
+    def factory(port: int, **kwargs) -> ZabbixSenderSink:
+        kwargs.setdefault("flush_interval", 60)
+        kwargs.setdefault("timeout", 2)
+        sink = ZabbixSenderSink(
+            server="127.0.0.1", port=port, host="monitor", spool_path=str(tmp_path / "zabbix.jsonl"), **kwargs
+        )
+        sinks.append(sink)
+        return sink
+
+    yield factory
+    for sink in sinks:
+        sink.close(timeout=1)
+
+
+def test_batch_framing_and_payload(make_sink):
+    trapper = FakeTrapper()
+    sink = make_sink(trapper.port)
+    sink.write_result(_route("a"), _payload("a", 1))
+
+    assert sink.flush()
+    trapper.close()
+
+    header = trapper.headers[0]
+    assert header.startswith(b"ZBXD\x01")
+    request = trapper.batches[0]
+    assert request["request"] == "sender data"
+    item = request["data"][0]
+    assert item["host"] == "monitor"
+    assert item["key"] == "sber.monitoring.result[a]"
+    assert json.loads(item["value"]) == _payload("a", 1)
+    assert (item["clock"], item["ns"]) == (1716897600, 250000000)
+
+
+def test_results_for_same_route_are_coalesced(make_sink):
+    trapper = FakeTrapper()
+    sink = make_sink(trapper.port)
+    for attempt in range(3):
+        sink.write_result(_route("a"), _payload("a", attempt))
+    sink.write_result(_route("b"), _payload("b", 0))
+
+    assert sink.flush()
+    trapper.close()
+
+    assert trapper.keys() == [[("sber.monitoring.result[a]", 2), ("sber.monitoring.result[b]", 0)]]
+
+
+def test_spooled_results_are_sent_first_after_recovery(make_sink, tmp_path):
+    port = _free_port()
+    sink = make_sink(port)
+    sink.write_result(_route("a"), _payload("a", 1))
+
+    assert not sink.flush()
+    assert (tmp_path / "zabbix.jsonl").exists()
+
+    trapper = FakeTrapper(port=port)
+    sink.write_result(_route("b"), _payload("b", 1))
+    assert sink.flush()
+    trapper.close()
+
+    assert trapper.keys() == [[("sber.monitoring.result[a]", 1)], [("sber.monitoring.result[b]", 1)]]
+    assert not (tmp_path / "zabbix.jsonl").exists()
+
+
+def test_close_spools_results_when_receiver_hangs(make_sink, tmp_path):
+    trapper = FakeTrapper(reply=False)
+    sink = make_sink(trapper.port, timeout=5, flush_interval=0.1)
+    sink.write_result(_route("a"), _payload("a", 1))
+    _wait_until(lambda: trapper.batches)
+    sink.write_result(_route("b"), _payload("b", 1))
+
+    sink.close(timeout=0.5)
+    trapper.close()
+
+    spooled = [json.loads(line)["key"] for line in (tmp_path / "zabbix.jsonl").read_text().splitlines()]
+    assert "sber.monitoring.result[a]" in spooled
+    assert "sber.monitoring.result[b]" in spooled
+
+
+def test_failed_items_are_reported(make_sink, caplog):
+    trapper = FakeTrapper(failed=1)
+    sink = make_sink(trapper.port)
+    sink.write_result(_route("a"), _payload("a", 1))
+
+    with caplog.at_level(logging.WARNING, logger="sinks.zabbix"):
+        assert sink.flush()
+    trapper.close()
+
+    assert "failed: 1" in caplog.text
+
+
+def test_rejected_batch_is_dropped_not_spooled(make_sink, tmp_path, caplog):
+    trapper = FakeTrapper(response="failed")
+    sink = make_sink(trapper.port)
+    sink.write_result(_route("a"), _payload("a", 1))
+
+    with caplog.at_level(logging.ERROR, logger="sinks.zabbix"):
+        assert sink.flush()
+    sink.write_result(_route("b"), _payload("b", 1))
+    assert sink.flush()
+    trapper.close()
+
+    assert trapper.keys() == [[("sber.monitoring.result[a]", 1)], [("sber.monitoring.result[b]", 1)]]
+    assert not (tmp_path / "zabbix.jsonl").exists()
+    assert "sber.monitoring.result[a]" in caplog.text
+
+
+def test_spool_trim_keeps_unsent_records(make_sink, tmp_path):
+    sink = make_sink(_free_port())
+    record_size = len(json.dumps(sink._format(_route("a"), _payload("a", 0)), ensure_ascii=False)) + 1
+    sink.spool_max_bytes = record_size * 3
+    sink._spool([sink._format(_route(name), _payload(name, 0)) for name in "abc"])
+
+    # Пока отправляются a и b, спул дописывается и его голова (a) отрезается лимитом размера.
+    entries = sink._read_spool()
+    sink._spool([sink._format(_route("d"), _payload("d", 0))])
+    sink._drop_spooled(entries[1][0])
+
+    assert [record["key"] for _, record in sink._read_spool()] == [
+        "sber.monitoring.result[c]",
+        "sber.monitoring.result[d]",
+    ]
+
+
+class LineListener:
+    """Принимает строки line protocol по TCP или UDP."""
+
+    def __init__(self, kind: int, host: str = "127.0.0.1", family: int = socket.AF_INET) -> None:
+        self.kind = kind
+        self.chunks = []
+        self._socket = socket.socket(family, kind)
+        self._socket.bind((host, 0))
+        self.port = self._socket.getsockname()[1]
+        if kind == socket.SOCK_STREAM:
+            self._socket.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                if self.kind == socket.SOCK_DGRAM:
+                    self.chunks.append(self._socket.recv(65535))
+                    continue
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            with conn:
+                data = b""
+                while True:
+                    chunk = conn.recv(65535)
+                    if not chunk:
+                        break
+                    data += chunk
+                self.chunks.append(data)
+
+    def lines(self):
+        return b"".join(self.chunks).decode("utf-8").splitlines()
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+def _line_sink(url: str) -> LineProtocolSink:
+    return LineProtocolSink(url=url, flush_interval=60, timeout=2)
+
+
+def _http_payload(**overrides) -> dict:
+    payload = {
+        "method": "GET",
+        "timestamp": "2024-05-28T12:00:00+00:00",
+        "ok": True,
+        "status_code": 200,
+        "response_time_ms": 12.5,
+        "limit_wait_ms": 0.0,
+        "error": None,
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_line_protocol_format_escapes_tags_and_types_fields():
+    sink = _line_sink("udp://127.0.0.1:9")
+    try:
+        line = sink._format(
+            _route("my route,a=b"), _http_payload(ok=False, status_code=None, error='bad "quote" \\ path')
+        )
+    finally:
+        sink.close(timeout=1)
+
+    assert line == (
+        "http_route,name=my\\ route\\,a\\=b,method=GET "
+        'ok=false,response_time_ms=12.5,limit_wait_ms=0.0,error="bad \\"quote\\" \\\\ path" '
+        "1716897600000000000"
+    )
+
+
+def test_line_protocol_integer_and_boolean_fields():
+    sink = _line_sink("udp://127.0.0.1:9")
+    try:
+        line = sink._format(_route("a"), _http_payload())
+    finally:
+        sink.close(timeout=1)
+
+    assert " ok=true,status_code=200i,response_time_ms=12.5," in line
+
+
+@pytest.mark.parametrize("url", ["http://127.0.0.1:8089", "tcp://127.0.0.1", "udp://:8089"])
+def test_line_protocol_rejects_bad_url(url):
+    with pytest.raises(ValueError, match="tcp://host:port"):
+        LineProtocolSink.parse_url(url)
+
+
+def test_line_protocol_over_tcp():
+    listener = LineListener(socket.SOCK_STREAM)
+    sink = _line_sink(f"tcp://127.0.0.1:{listener.port}")
+    sink.write_result(_route("a"), _http_payload())
+    sink.write_result(_route("b"), _http_payload())
+
+    assert sink.flush()
+    _wait_until(lambda: listener.chunks)
+    sink.close(timeout=1)
+    listener.close()
+
+    lines = listener.lines()
+    assert [line.split(",", 2)[1] for line in lines] == ["name=a", "name=b"]
+    assert listener.chunks[0].endswith(b"\n")
+
+
+def test_line_protocol_over_udp_splits_datagrams():
+    listener = LineListener(socket.SOCK_DGRAM)
+    sink = _line_sink(f"udp://127.0.0.1:{listener.port}")
+    names = [f"route-{index:03d}" for index in range(40)]
+    for name in names:
+        sink.write_result(_route(name), _http_payload())
+
+    assert sink.flush()
+    _wait_until(lambda: len(listener.lines()) == len(names))
+    sink.close(timeout=1)
+    listener.close()
+
+    assert len(listener.chunks) > 1
+    assert all(len(chunk) <= UDP_MAX_DATAGRAM for chunk in listener.chunks)
+    assert [line.split(",", 2)[1] for line in listener.lines()] == [f"name={name}" for name in names]
+
+
+@pytest.mark.skipif(not socket.has_ipv6, reason="IPv6 is not available")
+def test_line_protocol_over_udp_ipv6():
+    try:
+        listener = LineListener(socket.SOCK_DGRAM, host="::1", family=socket.AF_INET6)
+    except OSError:
+        pytest.skip("IPv6 loopback is not available")
+    sink = _line_sink(f"udp://[::1]:{listener.port}")
+    sink.write_result(_route("a"), _http_payload())
+
+    assert sink.flush()
+    _wait_until(lambda: listener.chunks)
+    sink.close(timeout=1)
+    listener.close()
+
+    assert listener.lines()[0].startswith("http_route,name=a,")
+
+
+class RecordingSink(ResultSink):
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.results = []
+        self.closed = False
+
+    def write_result(self, route_config, payload):
+        if self.fail:
+            raise OSError("disk full")
+        self.results.append(route_config.name)
+
+    def close(self):
+        self.closed = True
+
+
+def test_fan_out_isolates_failing_sink():
+    broken, healthy = RecordingSink(fail=True), RecordingSink()
+    sink = FanOutSink([broken, healthy])
+
+    sink.write_result(_route("a"), _payload("a", 1))
+    sink.close()
+
+    assert healthy.results == ["a"]
+    assert broken.closed and healthy.closed
+
+
+def _args(tmp_path, **overrides) -> argparse.Namespace:
+    values = {
+        "results_path": str(tmp_path / "results.json"),
+        "zabbix_server": None,
+        "zabbix_host": "monitor",
+        "zabbix_key": "custom[{name}]",
+        "line_protocol": None,
+        "spool_dir": str(tmp_path / "spool"),
+        "push_interval": 60.0,
+    }
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def test_build_sink_without_push_targets_is_file_writer(tmp_path):
+    sink = main.build_sink(_args(tmp_path))
+
+    assert isinstance(sink, ResultWriter)
+
+
+def test_build_sink_with_push_targets(tmp_path):
+    sink = main.build_sink(
+        _args(tmp_path, zabbix_server="zabbix.local", line_protocol="udp://127.0.0.1:8089")
+    )
+    try:
+        writer, zabbix, line = sink.sinks
+    finally:
+        sink.close()
+
+    assert isinstance(sink, FanOutSink)
+    assert isinstance(writer, ResultWriter)
+    assert (zabbix.server, zabbix.port, zabbix.host) == ("zabbix.local", 10051, "monitor")
+    assert zabbix.key_template == "custom[{name}]"
+    assert zabbix.spool_path == tmp_path / "spool" / "zabbix.jsonl"
+    assert (line.scheme, line.address) == ("udp", ("127.0.0.1", 8089))
+    assert line.spool_path == tmp_path / "spool" / "line_protocol.jsonl"
+
+
+def test_build_sink_parses_zabbix_port(tmp_path):
+    sink = main.build_sink(_args(tmp_path, zabbix_server="zabbix.local:10151"))
+    try:
+        _, zabbix = sink.sinks
+    finally:
+        sink.close()
+
+    assert zabbix.port == 10151
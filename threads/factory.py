@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 from threading import Event
-from typing import List, Sequence
+from typing import List, Optional, Sequence
 
-from monitoring.persistence import ResultWriter
+from monitoring.limits import LimitRegistry, RouteLimiter
+from monitoring.persistence import ResultSink
 from monitoring.types import HttpRouteConfig
 from threads.http_route import HttpRouteMonitor
 
@@ -12,9 +13,9 @@ MonitorList = List[HttpRouteMonitor]
 
 
 def _http_builder(
-    cfg: HttpRouteConfig, writer: ResultWriter, stop_event: Event, one_shot: bool
+    cfg: HttpRouteConfig, writer: ResultSink, stop_event: Event, one_shot: bool, limiter: RouteLimiter
 ) -> HttpRouteMonitor:
-    return HttpRouteMonitor(cfg, writer, stop_event, one_shot=one_shot)
+    return HttpRouteMonitor(cfg, writer, stop_event, one_shot=one_shot, limiter=limiter)
 
 
 BUILDERS = {
@@ -23,14 +24,19 @@ BUILDERS = {
 
 
 def build_monitors(
-    routes: Sequence[HttpRouteConfig], writer: ResultWriter, stop_event: Event, one_shot: bool = False
+    routes: Sequence[HttpRouteConfig],
+    writer: ResultSink,
+    stop_event: Event,
+    one_shot: bool = False,
+    limits: Optional[LimitRegistry] = None,
 ) -> MonitorList:
+    limits = limits or LimitRegistry()
     monitors: MonitorList = []
     for cfg in routes:
         builder = BUILDERS.get(cfg.monitor_type)
         if not builder:
             raise ValueError(f"Неподдерживаемый тип монитора: {cfg.monitor_type}")
-        monitors.append(builder(cfg, writer, stop_event, one_shot))
+        monitors.append(builder(cfg, writer, stop_event, one_shot, limits.for_route(cfg)))
     return monitors
 
 
@@ -11,7 +11,8 @@ from typing import Any, Dict, Mapping, Optional
 import requests
 from requests.auth import HTTPBasicAuth
 
-from monitoring.persistence import ResultWriter
+from monitoring.limits import LimitWaitCancelled, RouteLimiter
+from monitoring.persistence import ResultSink
 from monitoring.types import HttpRouteConfig
 from threads.base import BaseMonitorThread
 
@@ -20,11 +21,17 @@ TextResponse = Optional[str]
 
 class HttpRouteMonitor(BaseMonitorThread):
     def __init__(
-        self, config: HttpRouteConfig, writer: ResultWriter, stop_event: Event, one_shot: bool = False
+        self,
+        config: HttpRouteConfig,
+        writer: ResultSink,
+        stop_event: Event,
+        one_shot: bool = False,
+        limiter: Optional[RouteLimiter] = None,
     ) -> None:
         super().__init__(name=config.name, interval=config.interval, stop_event=stop_event, one_shot=one_shot)
         self.config = config
         self.writer = writer
+        self.limiter = limiter or RouteLimiter()
         self.session = requests.Session()
 
     def run(self) -> None:
@@ -34,7 +41,11 @@ class HttpRouteMonitor(BaseMonitorThread):
             self.session.close()
 
     def run_once(self) -> None:
-        payload = self._execute_request()
+        try:
+            payload = self._execute_request()
+        except LimitWaitCancelled:
+            self.logger.debug("Ожидание лимита прервано остановкой мониторинга")
+            return
         self.writer.write_result(self.config, payload)
 
     def _execute_request(self) -> Dict[str, Any]:
@@ -42,9 +53,13 @@ class HttpRouteMonitor(BaseMonitorThread):
         start = time.perf_counter()
         error_payload: Optional[str] = None
         response: Optional[requests.Response] = None
+        limit_wait_ms = 0.0
 
         try:
             with ExitStack() as stack:
+                limit_wait_ms = stack.enter_context(self.limiter.acquire(self.stop_event))
+                timestamp = datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
+                start = time.perf_counter()
                 files = self._prepare_files(stack)
                 data = self.config.data
                 json_payload = self.config.json_body
@@ -83,6 +98,7 @@ class HttpRouteMonitor(BaseMonitorThread):
             "method": self.config.method,
             "timestamp": timestamp,
             "response_time_ms": duration_ms,
+            "limit_wait_ms": limit_wait_ms,
             "tags": self.config.tags,
         }
 